@@ -1,7 +1,8 @@
 import csv
 import json
 import re
-from collections import Counter, defaultdict
+from array import array
+from collections import defaultdict
 from pathlib import Path
 
 
@@ -9,6 +10,20 @@ INPUT_JSONL = Path("/Users/johnlyman/Desktop/the-rock-salt/data/audience/faceboo
 OUTPUT_CSV = Path("/Users/johnlyman/Desktop/the-rock-salt/data/audience/facebook_scrapes/outreach_queue.csv")
 OUTPUT_JSON = Path("/Users/johnlyman/Desktop/the-rock-salt/data/audience/facebook_scrapes/outreach_queue.json")
 
+# Fixed topic set emitted by parse_facebook_scrapes.py (keys of topic_patterns)
+TOPICS = (
+    "booking_show_requests",
+    "band_member_search",
+    "lessons_teaching",
+    "studio_services",
+    "promotion_marketing",
+    "events_calendar",
+    "gear_marketplace",
+    "community_help",
+)
+TOPIC_INDEX = {topic: idx for idx, topic in enumerate(TOPICS)}
+SOURCE_TYPES = ("facebook", "social", "handle")
+
 
 def infer_role(text_blob: str, topics: set) -> str:
     text_blob = text_blob.lower()
@@ -39,81 +54,195 @@ def recommend_flow(topics: set) -> str:
     return "general_claim"
 
 
-def main():
-    entities = {}
+class StringTable:
+    """Interns repeated strings (socials, fb refs, sample text) as integer ids."""
 
-    with INPUT_JSONL.open("r", encoding="utf-8") as fh:
-        for line in fh:
-            try:
-                row = json.loads(line)
-            except json.JSONDecodeError:
-                continue
-            if "error" in row:
-                continue
+    __slots__ = ("ids", "values")
+
+    def __init__(self):
+        self.ids = {}
+        self.values = []
+
+    def intern(self, value):
+        string_id = self.ids.get(value)
+        if string_id is None:
+            string_id = self.ids[value] = len(self.values)
+            self.values.append(value)
+        return string_id
+
+
+class LinkTable:
+    """(entity_id, string_id) pairs packed into one 64-bit slot each, deduplicated in bulk."""
+
+    __slots__ = ("pairs", "limit")
+
+    def __init__(self):
+        self.pairs = array("Q")
+        self.limit = 1 << 16
+
+    def add(self, entity_id, string_ids):
+        tag = entity_id << 32
+        self.pairs.extend(tag | string_id for string_id in string_ids)
+        # Repeat mentions re-append the same pairs; squeeze them out whenever the array doubles
+        if len(self.pairs) >= self.limit:
+            self.compact()
+            self.limit = max(1 << 16, 2 * len(self.pairs))
+
+    def compact(self):
+        self.pairs = array("Q", sorted(set(self.pairs)))
+
+    def grouped(self, strings):
+        self.compact()
+        grouped = defaultdict(list)
+        for pair in self.pairs:
+            grouped[pair >> 32].append(strings.values[pair & 0xFFFFFFFF])
+        return grouped
+
+
+class EntityStore:
+    """Column-oriented entity aggregates: one array slot per entity instead of a dict of sets."""
+
+    __slots__ = (
+        "strings",
+        "entity_of",
+        "key_ids",
+        "source_types",
+        "counts",
+        "topic_counts",
+        "topic_order",
+        "sample_ids",
+        "socials",
+        "fb_refs",
+    )
+
+    def __init__(self):
+        self.strings = StringTable()
+        self.entity_of = array("i")  # string id of an entity key -> entity id, -1 otherwise
+        self.key_ids = array("I")  # entity id -> string id of its key
+        self.source_types = array("B")
+        self.counts = array("I")
+        self.topic_counts = array("I")  # len(TOPICS) counters per entity
+        self.topic_order = array("I")  # first-seen topic order, 4 bits (index + 1) per topic
+        self.sample_ids = array("i")  # -1 until a non-empty text blob is seen
+        self.socials = LinkTable()
+        self.fb_refs = LinkTable()
+
+    def __len__(self):
+        return len(self.key_ids)
+
+    def key(self, entity_id):
+        return self.strings.values[self.key_ids[entity_id]]
+
+    def entity_id(self, key, source_type):
+        key_id = self.strings.intern(key)
+        if key_id >= len(self.entity_of):
+            self.entity_of.extend([-1] * (key_id + 1 - len(self.entity_of)))
+        entity_id = self.entity_of[key_id]
+        if entity_id < 0:
+            entity_id = self.entity_of[key_id] = len(self.key_ids)
+            self.key_ids.append(key_id)
+            self.source_types.append(SOURCE_TYPES.index(source_type))
+            self.counts.append(0)
+            self.topic_counts.extend([0] * len(TOPICS))
+            self.topic_order.append(0)
+            self.sample_ids.append(-1)
+        return entity_id
+
+    def add(self, entity_id, topic_ids, sample_text, social_ids, fb_ref_ids):
+        self.counts[entity_id] += 1
+        base = entity_id * len(TOPICS)
+        for topic_id in topic_ids:
+            if not self.topic_counts[base + topic_id]:
+                order = self.topic_order[entity_id]
+                shift = 0
+                while order >> shift:
+                    shift += 4
+                self.topic_order[entity_id] = order | ((topic_id + 1) << shift)
+            self.topic_counts[base + topic_id] += 1
+        if self.sample_ids[entity_id] < 0 and sample_text:
+            self.sample_ids[entity_id] = self.strings.intern(sample_text)
+        self.socials.add(entity_id, social_ids)
+        self.fb_refs.add(entity_id, fb_ref_ids)
 
-            text_candidates = row.get("text_candidates", [])
-            text_blob = " ".join(text_candidates)
-            topics = set(row.get("topics", []))
-
-            fb_entities = row.get("facebook_entities", [])
-            socials = row.get("socials", [])
-            at_handles = row.get("at_handles", [])
-
-            keys = []
-            for fb in fb_entities:
-                if fb.get("type") in {"facebook_page", "facebook_profile_id"}:
-                    keys.append(("facebook", f"{fb.get('type')}:{fb.get('id')}"))
-
-            for social in socials:
-                keys.append(("social", f"{social.get('platform')}:{social.get('handle')}"))
-
-            for handle in at_handles:
-                keys.append(("handle", f"mention:{handle}"))
-
-            for source_type, key in keys:
-                entry = entities.setdefault(
-                    key,
-                    {
-                        "key": key,
-                        "source_type": source_type,
-                        "count": 0,
-                        "topics": Counter(),
-                        "sample_text": None,
-                        "socials": set(),
-                        "fb_refs": set(),
-                    },
-                )
-                entry["count"] += 1
-                for topic in topics:
-                    entry["topics"][topic] += 1
-                if not entry["sample_text"] and text_blob:
-                    entry["sample_text"] = text_blob[:280]
-                for social in socials:
-                    entry["socials"].add(f"{social.get('platform')}:{social.get('handle')}")
-                for fb in fb_entities:
-                    fb_type = fb.get("type")
-                    if fb_type in {"facebook_page", "facebook_profile_id"}:
-                        entry["fb_refs"].add(f"{fb_type}:{fb.get('id')}")
+    def add_post(self, row):
+        """Fold one normalized_posts.jsonl row into the aggregates of every entity it mentions."""
+        text_candidates = row.get("text_candidates", [])
+        text_blob = " ".join(text_candidates)
+        topic_ids = [TOPIC_INDEX[t] for t in dict.fromkeys(row.get("topics", [])) if t in TOPIC_INDEX]
+
+        fb_entities = row.get("facebook_entities", [])
+        socials = row.get("socials", [])
+        at_handles = row.get("at_handles", [])
+
+        keys = []
+        for fb in fb_entities:
+            if fb.get("type") in {"facebook_page", "facebook_profile_id"}:
+                keys.append(("facebook", f"{fb.get('type')}:{fb.get('id')}"))
+
+        for social in socials:
+            keys.append(("social", f"{social.get('platform')}:{social.get('handle')}"))
+
+        for handle in at_handles:
+            keys.append(("handle", f"mention:{handle}"))
+
+        if not keys:
+            return
+
+        social_ids = {self.strings.intern(f"{social.get('platform')}:{social.get('handle')}") for social in socials}
+        fb_ref_ids = {
+            self.strings.intern(f"{fb.get('type')}:{fb.get('id')}")
+            for fb in fb_entities
+            if fb.get("type") in {"facebook_page", "facebook_profile_id"}
+        }
+        sample_text = text_blob[:280]
+        for source_type, key in keys:
+            self.add(self.entity_id(key, source_type), topic_ids, sample_text, social_ids, fb_ref_ids)
+
+    def topics(self, entity_id):
+        """Seen topics as (topic, count), ordered by first appearance."""
+        base = entity_id * len(TOPICS)
+        order = self.topic_order[entity_id]
+        seen = []
+        while order:
+            topic_id = (order & 0xF) - 1
+            seen.append((TOPICS[topic_id], self.topic_counts[base + topic_id]))
+            order >>= 4
+        return seen
+
+    def sample_text(self, entity_id):
+        sample_id = self.sample_ids[entity_id]
+        return self.strings.values[sample_id] if sample_id >= 0 else None
+
+
+def build_rows(entities):
+    entity_socials = entities.socials.grouped(entities.strings)
+    entity_fb_refs = entities.fb_refs.grouped(entities.strings)
 
     rows = []
-    for entry in entities.values():
-        topics = set(entry["topics"].keys())
+    for entity_id in range(len(entities)):
+        topic_counts = entities.topics(entity_id)
+        topics = {t for t, _ in topic_counts}
+        topic_counts.sort(key=lambda item: item[1], reverse=True)
+        sample_text = entities.sample_text(entity_id)
         row = {
-            "entity_key": entry["key"],
-            "source_type": entry["source_type"],
-            "count": entry["count"],
-            "primary_topics": ",".join([t for t, _ in entry["topics"].most_common(3)]),
+            "entity_key": entities.key(entity_id),
+            "source_type": SOURCE_TYPES[entities.source_types[entity_id]],
+            "count": entities.counts[entity_id],
+            "primary_topics": ",".join([t for t, _ in topic_counts[:3]]),
             "recommended_flow": recommend_flow(topics),
-            "role_guess": infer_role(entry.get("sample_text") or "", topics),
-            "socials": ",".join(sorted(entry["socials"])),
-            "fb_refs": ",".join(sorted(entry["fb_refs"])),
-            "sample_text": entry.get("sample_text") or "",
+            "role_guess": infer_role(sample_text or "", topics),
+            "socials": ",".join(sorted(entity_socials.get(entity_id, []))),
+            "fb_refs": ",".join(sorted(entity_fb_refs.get(entity_id, []))),
+            "sample_text": sample_text or "",
         }
         rows.append(row)
 
     rows.sort(key=lambda r: r["count"], reverse=True)
+    return rows
+
 
-    with OUTPUT_CSV.open("w", encoding="utf-8", newline="") as fh:
+def write_queue_csv(rows, path):
+    with path.open("w", encoding="utf-8", newline="") as fh:
         writer = csv.DictWriter(
             fh,
             fieldnames=[
@@ -131,7 +260,27 @@ def main():
         writer.writeheader()
         writer.writerows(rows)
 
-    OUTPUT_JSON.write_text(json.dumps(rows[:1000], indent=2), encoding="utf-8")
+
+def write_queue_json(rows, path):
+    path.write_text(json.dumps(rows[:1000], indent=2), encoding="utf-8")
+
+
+def main():
+    entities = EntityStore()
+
+    with INPUT_JSONL.open("r", encoding="utf-8") as fh:
+        for line in fh:
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if "error" in row:
+                continue
+            entities.add_post(row)
+
+    rows = build_rows(entities)
+    write_queue_csv(rows, OUTPUT_CSV)
+    write_queue_json(rows, OUTPUT_JSON)
 
 
 if __name__ == "__main__":
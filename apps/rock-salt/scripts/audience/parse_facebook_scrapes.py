@@ -1,9 +1,19 @@
 import csv
 import json
+import math
+import os
 import re
 from collections import Counter, defaultdict
+from itertools import islice
 from pathlib import Path
 
+from sketches import CountMinSketch, HyperLogLog, SpaceSaving
+
+try:
+    import polars as pl
+except ImportError:
+    pl = None
+
 
 FILES = [
     Path("/Users/johnlyman/Downloads/facebook (10).csv"),
@@ -14,7 +24,17 @@ FILES = [
 ]
 
 OUTPUT_DIR = Path("/Users/johnlyman/Desktop/the-rock-salt/data/audience/facebook_scrapes")
-OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+
+# "auto" uses polars when it is installed and falls back to the stdlib csv reader.
+READER_BACKEND = os.getenv("FB_SCRAPE_READER", "auto").lower()
+BATCH_ROWS = int(os.getenv("FB_SCRAPE_BATCH_ROWS", "5000"))
+
+# Sketch mode swaps the exact entity counters for fixed-memory approximate summaries
+SKETCH_MODE = os.getenv("FB_SCRAPE_SKETCH", "false").lower() == "true"
+SKETCH_EPSILON = float(os.getenv("FB_SCRAPE_SKETCH_EPSILON", "0.0005"))
+SKETCH_DELTA = float(os.getenv("FB_SCRAPE_SKETCH_DELTA", "0.01"))
+SKETCH_TOP_K = int(os.getenv("FB_SCRAPE_SKETCH_TOP_K", "1000"))
+SKETCH_HLL_PRECISION = int(os.getenv("FB_SCRAPE_SKETCH_HLL_PRECISION", "14"))
 
 URL_RE = re.compile(r"https?://\S+")
 EMAIL_RE = re.compile(r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}")
@@ -184,83 +204,275 @@ def extract_at_handles(texts):
     return list(dict.fromkeys(handles))
 
 
-def main():
-    entity_counter = Counter()
-    entity_samples = {}
-    group_counter = Counter()
-    topic_counter = Counter()
-    file_row_counts = Counter()
-
-    topic_patterns = {
-        "booking_show_requests": [r"book", r"booking", r"looking for bands", r"open slot", r"open date", r"show", r"gig", r"host", r"venue"],
-        "band_member_search": [r"drummer", r"bassist", r"guitarist", r"keys", r"keyboard", r"vocalist", r"singer", r"bandmate", r"looking for"],
-        "lessons_teaching": [r"lesson", r"lessons", r"teaching", r"coach", r"instructor"],
-        "studio_services": [r"mixing", r"mastering", r"studio", r"recording", r"producer", r"engineering"],
-        "promotion_marketing": [r"new single", r"new album", r"out now", r"stream", r"watch", r"video", r"playlist"],
-        "events_calendar": [r"event", r"fri", r"sat", r"sun", r"pm", r"am", r"no cover", r"free show"],
-        "gear_marketplace": [r"for sale", r"selling", r"wts", r"wtt", r"gear", r"amp", r"pedal"],
-        "community_help": [r"recommend", r"looking for", r"where can i", r"who knows"],
+def iter_rows_stdlib(file_path, start=0):
+    with file_path.open(newline="", encoding="utf-8") as fh:
+        reader = csv.reader(fh)
+        header = next(reader, None)
+        for row in islice(reader, start, None):
+            yield extract_urls(row), extract_text_candidates(row)
+
+
+def iter_rows_polars(file_path, start=0):
+    frame = pl.scan_csv(
+        file_path,
+        infer_schema=False,
+        raise_if_empty=False,
+        skip_rows_after_header=start,
+    )
+    if not frame.collect_schema().names():
+        return
+    value = pl.col("value")
+    done = 0
+    try:
+        for batch in frame.collect_batches(chunk_size=BATCH_ROWS):
+            # One long column of (row, cell) so each regex runs once per batch instead of once per cell
+            cells = batch.with_row_index("row").unpivot(index="row").drop_nulls("value")
+            urls = (
+                cells.filter(value.str.contains(URL_RE.pattern))
+                .group_by("row", maintain_order=True)
+                .agg(value.str.extract_all(URL_RE.pattern).explode().unique(maintain_order=True).alias("urls"))
+            )
+            # Same checks as is_text_candidate(), cheapest first
+            texts = (
+                cells.filter(
+                    (value.str.len_chars() >= 20)
+                    & ~value.is_in(list(STOP_VALUES))
+                    & ~value.str.contains(URL_RE.pattern)
+                    & ~value.str.contains("emoji.php", literal=True)
+                    & value.str.contains(r"(?:[A-Za-z][^A-Za-z]*){5}")
+                )
+                .group_by("row", maintain_order=True)
+                .agg(value.str.replace_all(r"\\s+", " ").str.strip_chars().unique(maintain_order=True).alias("text_candidates"))
+            )
+            rows = (
+                pl.DataFrame({"row": pl.int_range(batch.height, dtype=pl.UInt32, eager=True)})
+                .join(urls, on="row", how="left")
+                .join(texts, on="row", how="left")
+                .sort("row")
+            )
+            for row_urls, text_candidates in zip(rows["urls"].to_list(), rows["text_candidates"].to_list()):
+                yield row_urls or [], text_candidates or []
+            done += batch.height
+    except pl.exceptions.ComputeError:
+        # A row wider than the header: polars would drop its extra cells, csv keeps them
+        yield from iter_rows_stdlib(file_path, start + done)
+
+
+def iter_rows(file_path, start=0):
+    """Yield (urls, text_candidates) per data row, skipping the first `start` rows."""
+    if READER_BACKEND == "csv" or (READER_BACKEND == "auto" and pl is None):
+        return iter_rows_stdlib(file_path, start)
+    if pl is None:
+        raise SystemExit("FB_SCRAPE_READER=polars requires the polars package")
+    return iter_rows_polars(file_path, start)
+
+
+TOPIC_PATTERNS = {
+    "booking_show_requests": [r"book", r"booking", r"looking for bands", r"open slot", r"open date", r"show", r"gig", r"host", r"venue"],
+    "band_member_search": [r"drummer", r"bassist", r"guitarist", r"keys", r"keyboard", r"vocalist", r"singer", r"bandmate", r"looking for"],
+    "lessons_teaching": [r"lesson", r"lessons", r"teaching", r"coach", r"instructor"],
+    "studio_services": [r"mixing", r"mastering", r"studio", r"recording", r"producer", r"engineering"],
+    "promotion_marketing": [r"new single", r"new album", r"out now", r"stream", r"watch", r"video", r"playlist"],
+    "events_calendar": [r"event", r"fri", r"sat", r"sun", r"pm", r"am", r"no cover", r"free show"],
+    "gear_marketplace": [r"for sale", r"selling", r"wts", r"wtt", r"gear", r"amp", r"pedal"],
+    "community_help": [r"recommend", r"looking for", r"where can i", r"who knows"],
+}
+
+
+def normalize_row(source_file, idx, urls, text_candidates):
+    """Build the normalized_posts.jsonl payload for one row.
+
+    Also returns the row's (entity, url) references in URL order, which drives the entity index.
+    """
+    fb_entities = []
+    socials = []
+    external_links = []
+    entity_refs = []
+    for url in urls:
+        fb_entity = classify_facebook_url(url)
+        if fb_entity:
+            entity_refs.append((fb_entity, url))
+            fb_entities.append({"type": fb_entity[0], "id": fb_entity[1], "url": url})
+            continue
+
+        social = classify_social_url(url)
+        if social:
+            entity_refs.append((("social", f"{social[0]}:{social[1]}"), url))
+            socials.append({"platform": social[0], "handle": social[1], "url": url})
+            continue
+
+        external_links.append(url)
+
+    # Topic tagging
+    topics = set()
+    combined_text = " ".join(text_candidates).lower()
+    for topic, patterns in TOPIC_PATTERNS.items():
+        if any(re.search(pat, combined_text) for pat in patterns):
+            topics.add(topic)
+
+    payload = {
+        "source_file": source_file,
+        "row_index": idx,
+        "text_candidates": text_candidates[:4],
+        "emails": extract_emails(text_candidates),
+        "phones": extract_phones(text_candidates),
+        "facebook_entities": fb_entities,
+        "socials": socials,
+        "at_handles": extract_at_handles(text_candidates),
+        "external_links": external_links[:10],
+        "topics": sorted(topics),
     }
+    return payload, entity_refs
+
+
+def payload_entity_refs(payload):
+    """Recover entity references from an already-written payload (fb entities first, then socials)."""
+    refs = [((fb["type"], fb["id"]), fb["url"]) for fb in payload.get("facebook_entities", [])]
+    refs.extend(
+        (("social", f"{social['platform']}:{social['handle']}"), social["url"]) for social in payload.get("socials", [])
+    )
+    return refs
+
+
+class ScrapeSummary:
+    """Running entity/topic/file counts behind entity_index.csv and summary.json."""
+
+    def __init__(self):
+        self.entity_counter = Counter()
+        self.entity_samples = {}
+        self.group_counter = Counter()
+        self.topic_counter = Counter()
+        self.file_row_counts = Counter()
+
+    def add(self, payload, entity_refs):
+        for entity, url in entity_refs:
+            self.entity_counter[entity] += 1
+            self.entity_samples.setdefault(entity, url)
+            if entity[0] == "facebook_group":
+                self.group_counter[entity[1]] += 1
+        topics = set(payload["topics"])
+        for topic in TOPIC_PATTERNS:
+            if topic in topics:
+                self.topic_counter[topic] += 1
+        self.file_row_counts[payload["source_file"]] += 1
+
+    def write_entity_index(self, path):
+        with path.open("w", encoding="utf-8", newline="") as fh:
+            writer = csv.writer(fh)
+            writer.writerow(["entity_type", "identifier", "count", "sample_url"])
+            for (etype, identifier), count in self.entity_counter.most_common():
+                writer.writerow([etype, identifier, count, self.entity_samples.get((etype, identifier), "")])
+
+    def write_summary(self, path):
+        summary = {
+            "total_entities": sum(self.entity_counter.values()),
+            "group_counts": self.group_counter.most_common(20),
+            "topic_counts": self.topic_counter.most_common(),
+            "file_counts": self.file_row_counts.most_common(),
+        }
+        path.write_text(json.dumps(summary, indent=2), encoding="utf-8")
+
+
+class SketchSummary:
+    """Fixed-memory counterpart of ScrapeSummary for multi-year archives.
+
+    Entity and group counts come from Space-Saving top-K (tightened by a Count-Min Sketch),
+    distinct counts from HyperLogLog. Summaries built with the same settings merge exactly.
+    """
+
+    def __init__(
+        self,
+        epsilon=SKETCH_EPSILON,
+        delta=SKETCH_DELTA,
+        top_k=SKETCH_TOP_K,
+        hll_precision=SKETCH_HLL_PRECISION,
+    ):
+        self.total_entities = 0
+        self.entity_counts = CountMinSketch(epsilon, delta)
+        self.top_entities = SpaceSaving(top_k)
+        self.top_groups = SpaceSaving(top_k)
+        self.distinct_entities = HyperLogLog(hll_precision)
+        self.distinct_groups = HyperLogLog(hll_precision)
+        # Bounded by the fixed topic set and the number of export files
+        self.topic_counter = Counter()
+        self.file_row_counts = Counter()
+
+    def add(self, payload, entity_refs):
+        for entity, url in entity_refs:
+            key = "\x1f".join(entity)
+            self.total_entities += 1
+            self.entity_counts.add(key)
+            self.top_entities.add(entity, url)
+            self.distinct_entities.add(key)
+            if entity[0] == "facebook_group":
+                self.top_groups.add(entity[1])
+                self.distinct_groups.add(entity[1])
+        topics = set(payload["topics"])
+        for topic in TOPIC_PATTERNS:
+            if topic in topics:
+                self.topic_counter[topic] += 1
+        self.file_row_counts[payload["source_file"]] += 1
+
+    def merge(self, other):
+        self.total_entities += other.total_entities
+        self.entity_counts.merge(other.entity_counts)
+        self.top_entities.merge(other.top_entities)
+        self.top_groups.merge(other.top_groups)
+        self.distinct_entities.merge(other.distinct_entities)
+        self.distinct_groups.merge(other.distinct_groups)
+        self.topic_counter.update(other.topic_counter)
+        self.file_row_counts.update(other.file_row_counts)
+
+    def entity_estimates(self):
+        """Top entities as (entity, estimated count, sample url); counts are upper bounds."""
+        estimates = [
+            (entity, min(hits, self.entity_counts.estimate("\x1f".join(entity))), sample)
+            for entity, hits, _, sample in self.top_entities.most_common()
+        ]
+        estimates.sort(key=lambda item: item[1], reverse=True)
+        return estimates
+
+    def write_entity_index(self, path):
+        with path.open("w", encoding="utf-8", newline="") as fh:
+            writer = csv.writer(fh)
+            writer.writerow(["entity_type", "identifier", "count", "sample_url"])
+            for (etype, identifier), estimate, sample in self.entity_estimates():
+                writer.writerow([etype, identifier, estimate, sample or ""])
+
+    def write_summary(self, path):
+        summary = {
+            "total_entities": self.total_entities,
+            "group_counts": [[group, hits] for group, hits, _, _ in self.top_groups.most_common(20)],
+            "topic_counts": self.topic_counter.most_common(),
+            "file_counts": self.file_row_counts.most_common(),
+            "approximate": {
+                "top_k": self.top_entities.k,
+                "count_overestimate_bound": math.ceil(self.entity_counts.epsilon * self.total_entities),
+                "count_bound_confidence": 1 - self.entity_counts.delta,
+                "distinct_entities": self.distinct_entities.estimate(),
+                "distinct_groups": self.distinct_groups.estimate(),
+                "distinct_relative_error": round(self.distinct_entities.relative_error, 4),
+            },
+        }
+        path.write_text(json.dumps(summary, indent=2), encoding="utf-8")
+
+
+def new_summary():
+    return SketchSummary() if SKETCH_MODE else ScrapeSummary()
+
+
+def main():
+    OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+    summary = new_summary()
 
     output_jsonl = OUTPUT_DIR / "normalized_posts.jsonl"
     with output_jsonl.open("w", encoding="utf-8") as out:
         for file_path in FILES:
             try:
-                with file_path.open(newline="", encoding="utf-8") as fh:
-                    reader = csv.reader(fh)
-                    header = next(reader, None)
-                    for idx, row in enumerate(reader):
-                        urls = extract_urls(row)
-                        text_candidates = extract_text_candidates(row)
-                        emails = extract_emails(text_candidates)
-                        phones = extract_phones(text_candidates)
-                        at_handles = extract_at_handles(text_candidates)
-
-                        fb_entities = []
-                        socials = []
-                        external_links = []
-                        for url in urls:
-                            fb_entity = classify_facebook_url(url)
-                            if fb_entity:
-                                entity_counter[fb_entity] += 1
-                                entity_samples.setdefault(fb_entity, url)
-                                if fb_entity[0] == "facebook_group":
-                                    group_counter[fb_entity[1]] += 1
-                                fb_entities.append({"type": fb_entity[0], "id": fb_entity[1], "url": url})
-                                continue
-
-                            social = classify_social_url(url)
-                            if social:
-                                social_key = f"{social[0]}:{social[1]}"
-                                entity_counter[("social", social_key)] += 1
-                                entity_samples.setdefault(("social", social_key), url)
-                                socials.append({"platform": social[0], "handle": social[1], "url": url})
-                                continue
-
-                            external_links.append(url)
-
-                        # Topic tagging
-                        topics = set()
-                        combined_text = " ".join(text_candidates).lower()
-                        for topic, patterns in topic_patterns.items():
-                            if any(re.search(pat, combined_text) for pat in patterns):
-                                topics.add(topic)
-                                topic_counter[topic] += 1
-
-                        payload = {
-                            "source_file": file_path.name,
-                            "row_index": idx,
-                            "text_candidates": text_candidates[:4],
-                            "emails": emails,
-                            "phones": phones,
-                            "facebook_entities": fb_entities,
-                            "socials": socials,
-                            "at_handles": at_handles,
-                            "external_links": external_links[:10],
-                            "topics": sorted(topics),
-                        }
-                        out.write(json.dumps(payload, ensure_ascii=False) + "\n")
-                        file_row_counts[file_path.name] += 1
+                for idx, (urls, text_candidates) in enumerate(iter_rows(file_path)):
+                    payload, entity_refs = normalize_row(file_path.name, idx, urls, text_candidates)
+                    out.write(json.dumps(payload, ensure_ascii=False) + "\n")
+                    summary.add(payload, entity_refs)
             except Exception as exc:
                 error_payload = {
                     "source_file": file_path.name,
@@ -268,22 +480,8 @@ def main():
                 }
                 out.write(json.dumps(error_payload, ensure_ascii=False) + "\n")
 
-    # Entity index
-    entity_index_path = OUTPUT_DIR / "entity_index.csv"
-    with entity_index_path.open("w", encoding="utf-8", newline="") as fh:
-        writer = csv.writer(fh)
-        writer.writerow(["entity_type", "identifier", "count", "sample_url"])
-        for (etype, identifier), count in entity_counter.most_common():
-            writer.writerow([etype, identifier, count, entity_samples.get((etype, identifier), "")])
-
-    summary_path = OUTPUT_DIR / "summary.json"
-    summary = {
-        "total_entities": sum(entity_counter.values()),
-        "group_counts": group_counter.most_common(20),
-        "topic_counts": topic_counter.most_common(),
-        "file_counts": file_row_counts.most_common(),
-    }
-    summary_path.write_text(json.dumps(summary, indent=2), encoding="utf-8")
+    summary.write_entity_index(OUTPUT_DIR / "entity_index.csv")
+    summary.write_summary(OUTPUT_DIR / "summary.json")
 
 
 if __name__ == "__main__":
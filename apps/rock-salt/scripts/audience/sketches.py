@@ -0,0 +1,139 @@
+"""Fixed-memory, mergeable stream summaries used by the scrape parser's sketch mode.
+
+Hashes are derived from BLAKE2b rather than hash(), so sketches built in different
+processes (or on different days) line up and can be merged.
+"""
+import heapq
+import math
+from array import array
+from hashlib import blake2b
+
+
+def stable_hash(key):
+    return int.from_bytes(blake2b(key.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+class CountMinSketch:
+    """Point counts that overestimate by at most epsilon * total with probability 1 - delta."""
+
+    def __init__(self, epsilon=0.0005, delta=0.01):
+        self.epsilon = epsilon
+        self.delta = delta
+        self.width = math.ceil(math.e / epsilon)
+        self.depth = math.ceil(math.log(1 / delta))
+        self.table = array("Q", bytes(8 * self.width * self.depth))
+        self.total = 0
+
+    def _cells(self, key):
+        h = stable_hash(key)
+        h1, h2 = h & 0xFFFFFFFF, (h >> 32) | 1
+        return [row * self.width + (h1 + row * h2) % self.width for row in range(self.depth)]
+
+    def add(self, key, amount=1):
+        for cell in self._cells(key):
+            self.table[cell] += amount
+        self.total += amount
+
+    def estimate(self, key):
+        return min(self.table[cell] for cell in self._cells(key))
+
+    def merge(self, other):
+        if (self.width, self.depth) != (other.width, other.depth):
+            raise ValueError("Count-Min sketches must share epsilon/delta to merge")
+        for cell, value in enumerate(other.table):
+            self.table[cell] += value
+        self.total += other.total
+
+
+class SpaceSaving:
+    """Top-k heavy hitters in k counters; each count overestimates the true count by at most its error."""
+
+    def __init__(self, k=1000):
+        self.k = k
+        self.counters = {}  # item -> [count, error, sample]
+        self._heap = []  # (count, seq, item); counts may be stale, never too high
+        self._seq = 0  # heap tie-breaker
+
+    def add(self, item, sample=None):
+        entry = self.counters.get(item)
+        if entry is not None:
+            entry[0] += 1
+            return
+        if len(self.counters) < self.k:
+            self.counters[item] = [1, 0, sample]
+            heapq.heappush(self._heap, (1, self._next_seq(), item))
+            return
+        floor = self._evict_min()
+        self.counters[item] = [floor + 1, floor, sample]
+        heapq.heappush(self._heap, (floor + 1, self._next_seq(), item))
+
+    def _next_seq(self):
+        self._seq += 1
+        return self._seq
+
+    def _evict_min(self):
+        while True:
+            stale_count, _, item = heapq.heappop(self._heap)
+            entry = self.counters.get(item)
+            if entry is None:
+                continue
+            if entry[0] != stale_count:
+                heapq.heappush(self._heap, (entry[0], self._next_seq(), item))
+                continue
+            del self.counters[item]
+            return entry[0]
+
+    def _floor(self):
+        return min(entry[0] for entry in self.counters.values()) if len(self.counters) >= self.k else 0
+
+    def merge(self, other):
+        # Mergeable-summaries rule: an item missing from a full summary may have had up to its min count
+        floor_self, floor_other = self._floor(), other._floor()
+        merged = {}
+        for item in dict.fromkeys([*self.counters, *other.counters]):
+            mine = self.counters.get(item, [floor_self, floor_self, None])
+            theirs = other.counters.get(item, [floor_other, floor_other, None])
+            merged[item] = [mine[0] + theirs[0], mine[1] + theirs[1], mine[2] or theirs[2]]
+        keep = sorted(merged.items(), key=lambda kv: kv[1][0], reverse=True)[: self.k]
+        self.counters = dict(keep)
+        self._heap = [(entry[0], self._next_seq(), item) for item, entry in self.counters.items()]
+        heapq.heapify(self._heap)
+
+    def most_common(self, n=None):
+        """(item, count, error, sample) by descending count."""
+        ranked = sorted(self.counters.items(), key=lambda kv: kv[1][0], reverse=True)
+        return [(item, hits, error, sample) for item, (hits, error, sample) in ranked[:n]]
+
+
+class HyperLogLog:
+    """Distinct count with relative standard error 1.04 / sqrt(2 ** precision)."""
+
+    def __init__(self, precision=14):
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+    @property
+    def relative_error(self):
+        return 1.04 / math.sqrt(len(self.registers))
+
+    def add(self, key):
+        h = stable_hash(key)
+        rest_bits = 64 - self.precision
+        rest = h & ((1 << rest_bits) - 1)
+        rank = rest_bits - rest.bit_length() + 1
+        idx = h >> rest_bits
+        if rank > self.registers[idx]:
+            self.registers[idx] = rank
+
+    def estimate(self):
+        m = len(self.registers)
+        raw = (0.7213 / (1 + 1.079 / m)) * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if raw <= 2.5 * m and zeros:
+            return round(m * math.log(m / zeros))
+        return round(raw)
+
+    def merge(self, other):
+        if other.precision != self.precision:
+            raise ValueError("HyperLogLogs must share precision to merge")
+        self.registers = bytearray(map(max, self.registers, other.registers))
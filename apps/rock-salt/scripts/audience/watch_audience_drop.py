@@ -0,0 +1,264 @@
+"""Watch a drop directory for Facebook scrape exports and keep the outreach queue current.
+
+Only rows not yet ingested are parsed. They are appended to normalized_posts.jsonl and folded
+into persisted entity aggregates, then entity_index.csv, summary.json and the outreach queue
+are rewritten atomically. An export is recognised by its name plus a fingerprint of its header
+and first row, so a different download reusing a name is ingested from the top. Pass --once to
+ingest whatever is in the drop directory and exit.
+"""
+import ctypes
+import ctypes.util
+import json
+import os
+import pickle
+import select
+import struct
+import sys
+import time
+from hashlib import blake2b
+from pathlib import Path
+
+import build_outreach_queue as queue
+import parse_facebook_scrapes as scrapes
+
+
+DROP_DIR = os.getenv("AUDIENCE_DROP_DIR")
+POLL_SECONDS = float(os.getenv("AUDIENCE_POLL_SECONDS", "2"))
+# "auto" uses inotify where available and falls back to polling the directory.
+WATCH_BACKEND = os.getenv("AUDIENCE_WATCH", "auto").lower()
+
+STATE_PATH = scrapes.OUTPUT_DIR / "watch_state.pickle"
+NORMALIZED_JSONL = scrapes.OUTPUT_DIR / "normalized_posts.jsonl"
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+INOTIFY_EVENT = struct.Struct("iIII")
+
+
+def replace_atomically(path, write):
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def jsonl_signature():
+    try:
+        stat = NORMALIZED_JSONL.stat()
+    except FileNotFoundError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+def export_fingerprint(path):
+    """Digest of the header and first data row, which stay put while an export only grows."""
+    with path.open("rb") as fh:
+        return blake2b(fh.readline() + fh.readline(), digest_size=16).hexdigest()
+
+
+def load_state():
+    """Returns (summary, entities, offsets); offsets maps export name -> (fingerprint, rows, size)."""
+    summary = scrapes.new_summary()
+    if STATE_PATH.exists():
+        try:
+            with STATE_PATH.open("rb") as fh:
+                state = pickle.load(fh)
+        except Exception as exc:
+            print(f"[STATE] unreadable ({exc})")
+            state = None
+        # Only trust aggregates saved right after the JSONL reached its current size, in the current mode
+        if (
+            isinstance(state, dict)
+            and "offsets" in state
+            and state.get("jsonl") == jsonl_signature()
+            and state.get("summary_class") == type(summary).__name__
+        ):
+            return state["summary"], state["entities"], state["offsets"]
+        print(f"[STATE] stale; rebuilding from {NORMALIZED_JSONL.name}")
+
+    # Seed from the JSONL itself (batch run output, or rows appended before a crash) so no row is ingested twice
+    entities = queue.EntityStore()
+    offsets = {}
+    if NORMALIZED_JSONL.exists():
+        complete = 0
+        with NORMALIZED_JSONL.open("rb") as fh:
+            for line in fh:
+                if not line.endswith(b"\n"):
+                    break
+                complete += len(line)
+                try:
+                    payload = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if "error" in payload:
+                    continue
+                summary.add(payload, scrapes.payload_entity_refs(payload))
+                entities.add_post(payload)
+                # The last row written wins, so an export re-ingested from row 0 resumes after its new rows.
+                # Fingerprints are unknown here and get adopted from the file on its next ingest.
+                offsets[payload["source_file"]] = (None, payload["row_index"] + 1, 0)
+        # A line cut short by a crash would corrupt the next append
+        if complete < NORMALIZED_JSONL.stat().st_size:
+            os.truncate(NORMALIZED_JSONL, complete)
+    save_state(summary, entities, offsets)
+    return summary, entities, offsets
+
+
+def save_state(summary, entities, offsets):
+    state = {
+        "jsonl": jsonl_signature(),
+        "summary_class": type(summary).__name__,
+        "summary": summary,
+        "entities": entities,
+        "offsets": offsets,
+    }
+
+    def write(path):
+        with path.open("wb") as fh:
+            pickle.dump(state, fh, protocol=pickle.HIGHEST_PROTOCOL)
+
+    replace_atomically(STATE_PATH, write)
+
+
+def ingest(paths, summary, entities, offsets):
+    """Parse rows past each export's ingested row count and fold them into the aggregates.
+
+    An export whose header/first row changed, or that shrank, under a name already seen is a different
+    download reusing the name (``facebook (3).csv``), so it is ingested from the top.
+    """
+    new_rows = 0
+    with NORMALIZED_JSONL.open("a", encoding="utf-8") as out:
+        for file_path in paths:
+            name = file_path.name
+            try:
+                size = file_path.stat().st_size
+                fingerprint = export_fingerprint(file_path)
+            except OSError as exc:
+                print(f"[WARN] {name}: {exc}")
+                continue
+            seen_fingerprint, start, seen_size = offsets.get(name, (None, 0, 0))
+            if start and (seen_fingerprint not in (None, fingerprint) or size < seen_size):
+                print(f"[WARN] {name} was replaced by a different export; ingesting it from the first row")
+                start = 0
+            rows = start
+            try:
+                for idx, (urls, text_candidates) in enumerate(scrapes.iter_rows(file_path, start), start):
+                    payload, entity_refs = scrapes.normalize_row(name, idx, urls, text_candidates)
+                    out.write(json.dumps(payload, ensure_ascii=False) + "\n")
+                    summary.add(payload, entity_refs)
+                    entities.add_post(payload)
+                    rows = idx + 1
+                    new_rows += 1
+            except Exception as exc:
+                print(f"[WARN] {name}: {exc}")
+            offsets[name] = (fingerprint, rows, size)
+    return new_rows
+
+
+def publish(summary, entities, offsets):
+    replace_atomically(scrapes.OUTPUT_DIR / "entity_index.csv", summary.write_entity_index)
+    replace_atomically(scrapes.OUTPUT_DIR / "summary.json", summary.write_summary)
+    rows = queue.build_rows(entities)
+    replace_atomically(queue.OUTPUT_CSV, lambda path: queue.write_queue_csv(rows, path))
+    replace_atomically(queue.OUTPUT_JSON, lambda path: queue.write_queue_json(rows, path))
+    save_state(summary, entities, offsets)
+
+
+def list_exports(drop_dir):
+    return sorted(path for path in drop_dir.glob("*.csv") if path.is_file())
+
+
+def open_inotify(drop_dir):
+    libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+    fd = libc.inotify_init1(os.O_CLOEXEC)
+    if fd < 0:
+        raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+    if libc.inotify_add_watch(fd, os.fsencode(drop_dir), IN_CLOSE_WRITE | IN_MOVED_TO) < 0:
+        errno = ctypes.get_errno()
+        os.close(fd)
+        raise OSError(errno, f"inotify_add_watch failed for {drop_dir}")
+    return fd
+
+
+def watch_inotify(fd, drop_dir):
+    try:
+        # Anything dropped before the watch was registered
+        yield list_exports(drop_dir)
+        while True:
+            buf = os.read(fd, 64 * 1024)
+            # Let a multi-file drop settle into one batch
+            while select.select([fd], [], [], 0.2)[0]:
+                buf += os.read(fd, 64 * 1024)
+            paths = []
+            offset = 0
+            while offset < len(buf):
+                wd, mask, cookie, length = INOTIFY_EVENT.unpack_from(buf, offset)
+                offset += INOTIFY_EVENT.size
+                name = os.fsdecode(buf[offset : offset + length].rstrip(b"\0"))
+                offset += length
+                if name.endswith(".csv") and not name.startswith("."):
+                    paths.append(drop_dir / name)
+            if paths:
+                yield list(dict.fromkeys(paths))
+    finally:
+        os.close(fd)
+
+
+def watch_polling(drop_dir):
+    def snapshot():
+        signatures = {}
+        for path in list_exports(drop_dir):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            signatures[path] = (stat.st_size, stat.st_mtime_ns)
+        return signatures
+
+    previous = snapshot()
+    settled = dict(previous)
+    yield list(previous)
+    while True:
+        time.sleep(POLL_SECONDS)
+        current = snapshot()
+        # Only pick up files whose size/mtime held still for a full interval (download finished)
+        changed = [path for path, sig in current.items() if previous.get(path) == sig and settled.get(path) != sig]
+        for path in changed:
+            settled[path] = current[path]
+        previous = current
+        if changed:
+            yield changed
+
+
+def watch(drop_dir):
+    if WATCH_BACKEND != "poll":
+        try:
+            fd = open_inotify(drop_dir)
+        except (AttributeError, OSError) as exc:
+            if WATCH_BACKEND == "inotify":
+                raise
+            print(f"[WATCH] inotify unavailable ({exc}); polling every {POLL_SECONDS}s")
+        else:
+            return watch_inotify(fd, drop_dir)
+    return watch_polling(drop_dir)
+
+
+def main():
+    if not DROP_DIR:
+        raise SystemExit("Set AUDIENCE_DROP_DIR to the folder new Facebook export CSVs are dropped into")
+    drop_dir = Path(DROP_DIR)
+    scrapes.OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+    once = "--once" in sys.argv[1:]
+
+    summary, entities, offsets = load_state()
+    for paths in watch(drop_dir):
+        started = time.monotonic()
+        new_rows = ingest(paths, summary, entities, offsets)
+        if new_rows:
+            publish(summary, entities, offsets)
+            print(f"[INGEST] {new_rows} rows from {len(paths)} file(s) in {time.monotonic() - started:.2f}s")
+        if once:
+            break
+
+
+if __name__ == "__main__":
+    main()
@@ -4,8 +4,8 @@ import os
 import time
 import requests
 
-AZURACAST_BASE = "https://a8.asurahosting.com"
-STATION_ID = "693"
+import azuracast_catalog as catalog
+from azuracast_catalog import AZURACAST_BASE, STATION_ID
 
 API_KEY = os.getenv("AZURACAST_API_KEY")
 CSV_PATH = os.getenv("AZURACAST_CSV", "agent_outputs/therocksalt_all_media_normalized.csv")
@@ -15,16 +15,6 @@ if not API_KEY:
     raise SystemExit("Missing AZURACAST_API_KEY env var")
 
 
-def api_get(path):
-    r = requests.get(
-        f"{AZURACAST_BASE}{path}",
-        headers={"X-API-Key": API_KEY},
-        timeout=30,
-    )
-    r.raise_for_status()
-    return r.json()
-
-
 def api_post(path, payload=None):
     r = requests.post(
         f"{AZURACAST_BASE}{path}",
@@ -56,8 +46,11 @@ def api_put(path):
     return True, None
 
 
-playlists = api_get(f"/api/station/{STATION_ID}/playlists")
-playlist_map = {p["name"].strip().lower(): p["id"] for p in playlists}
+# Plan against the local mirror so rows that are already in their playlist cost no API calls
+conn = catalog.connect()
+catalog.refresh(conn, API_KEY)
+playlist_map = catalog.playlist_ids_by_name(conn)
+existing = catalog.memberships(conn)
 
 
 def get_playlist_id(name):
@@ -66,6 +59,7 @@ def get_playlist_id(name):
 
 missing = []
 assigned = 0
+skipped = 0
 failed = 0
 
 with open(CSV_PATH, newline="", encoding="utf-8") as f:
@@ -78,6 +72,10 @@ with open(CSV_PATH, newline="", encoding="utf-8") as f:
             missing.append(genre)
             continue
 
+        if (playlist_id, media_id) in existing:
+            skipped += 1
+            continue
+
         if DRY_RUN:
             print(f"[DRY RUN] {media_id} -> {genre}")
             continue
@@ -97,11 +95,13 @@ with open(CSV_PATH, newline="", encoding="utf-8") as f:
             )
         if ok:
             assigned += 1
+            existing.add((playlist_id, media_id))
+            catalog.record_membership(conn, playlist_id, media_id)
         else:
             failed += 1
             print(f"[WARN] {media_id} -> {genre}: {err}")
         time.sleep(0.1)
 
-print(f"Assigned: {assigned} | Failed: {failed}")
+print(f"Assigned: {assigned} | Already assigned: {skipped} | Failed: {failed}")
 if missing:
     print("Missing playlists:", sorted(set(missing)))
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""Local SQLite mirror of an AzuraCast station's playlists, media and playlist membership.
+
+Refreshed with paginated, concurrent fetches that revalidate each page with
+If-None-Match / If-Modified-Since, so an unchanged station costs one 304 per page.
+Run directly to refresh the mirror.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+AZURACAST_BASE = os.getenv("AZURACAST_BASE", "https://a8.asurahosting.com")
+STATION_ID = os.getenv("AZURACAST_STATION_ID", "693")
+CATALOG_PATH = os.getenv("AZURACAST_CATALOG", "agent_outputs/azuracast_catalog.sqlite3")
+PER_PAGE = int(os.getenv("AZURACAST_PER_PAGE", "500"))
+FETCH_WORKERS = int(os.getenv("AZURACAST_FETCH_WORKERS", "4"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS playlists (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    name_key TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS playlists_name_key ON playlists (name_key);
+CREATE TABLE IF NOT EXISTS media (
+    id INTEGER PRIMARY KEY,
+    unique_id TEXT,
+    path TEXT,
+    genre TEXT,
+    mtime INTEGER,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS media_path ON media (path);
+CREATE INDEX IF NOT EXISTS media_unique_id ON media (unique_id);
+CREATE TABLE IF NOT EXISTS playlist_media (
+    playlist_id INTEGER NOT NULL,
+    media_id INTEGER NOT NULL,
+    PRIMARY KEY (playlist_id, media_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS http_cache (
+    url TEXT PRIMARY KEY,
+    etag TEXT,
+    last_modified TEXT,
+    body TEXT NOT NULL,
+    fetched_at REAL NOT NULL
+);
+"""
+
+_local = threading.local()
+
+
+def connect(path=CATALOG_PATH):
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def _session():
+    session = getattr(_local, "session", None)
+    if session is None:
+        session = _local.session = requests.Session()
+    return session
+
+
+def conditional_get(url, api_key, cached):
+    """GET url, revalidating against a cached (etag, last_modified, body) row.
+
+    Returns (body, etag, last_modified, changed).
+    """
+    headers = {"X-API-Key": api_key}
+    if cached:
+        etag, last_modified, body = cached
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+    r = _session().get(url, headers=headers, timeout=30)
+    if r.status_code == 304 and cached:
+        return cached[2], cached[0], cached[1], False
+    r.raise_for_status()
+    return r.text, r.headers.get("ETag"), r.headers.get("Last-Modified"), True
+
+
+def page_rows(payload):
+    """Rows and page count of a paginated AzuraCast response (or a plain list)."""
+    if isinstance(payload, dict) and "rows" in payload:
+        return payload["rows"], int(payload.get("total_pages") or 1)
+    return payload, 1
+
+
+def refresh(conn, api_key=None):
+    """Bring the mirror up to date. Returns True if anything changed."""
+    api_key = api_key or os.getenv("AZURACAST_API_KEY")
+    if not api_key:
+        raise SystemExit("Missing AZURACAST_API_KEY env var")
+
+    cache = {
+        url: (etag, last_modified, body)
+        for url, etag, last_modified, body in conn.execute("SELECT url, etag, last_modified, body FROM http_cache")
+    }
+    playlists_url = f"{AZURACAST_BASE}/api/station/{STATION_ID}/playlists"
+    files_url = f"{AZURACAST_BASE}/api/station/{STATION_ID}/files?per_page={PER_PAGE}&page={{page}}"
+
+    def fetch(url):
+        return url, conditional_get(url, api_key, cache.get(url))
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=FETCH_WORKERS) as pool:
+        # Page 1 tells us how many media pages there are
+        for url, result in pool.map(fetch, [playlists_url, files_url.format(page=1)]):
+            results[url] = result
+        _, total_pages = page_rows(json.loads(results[files_url.format(page=1)][0]))
+        page_urls = [files_url.format(page=page) for page in range(2, total_pages + 1)]
+        for url, result in pool.map(fetch, page_urls):
+            results[url] = result
+
+    media_urls = [files_url.format(page=page) for page in range(1, total_pages + 1)]
+    changed = any(result[3] for result in results.values()) or set(cache) != set(results)
+
+    with conn:
+        now = time.time()
+        conn.execute("DELETE FROM http_cache")
+        conn.executemany(
+            "INSERT INTO http_cache (url, etag, last_modified, body, fetched_at) VALUES (?, ?, ?, ?, ?)",
+            [(url, etag, last_modified, body, now) for url, (body, etag, last_modified, _) in results.items()],
+        )
+        if not changed:
+            return False
+
+        conn.execute("DELETE FROM playlists")
+        conn.executemany(
+            "INSERT INTO playlists (id, name, name_key, data) VALUES (?, ?, ?, ?)",
+            [
+                (p["id"], p["name"], p["name"].strip().lower(), json.dumps(p))
+                for p in json.loads(results[playlists_url][0])
+            ],
+        )
+        conn.execute("DELETE FROM media")
+        conn.execute("DELETE FROM playlist_media")
+        for url in media_urls:
+            rows, _ = page_rows(json.loads(results[url][0]))
+            conn.executemany(
+                "INSERT OR REPLACE INTO media (id, unique_id, path, genre, mtime, data) VALUES (?, ?, ?, ?, ?, ?)",
+                [(m["id"], m.get("unique_id"), m.get("path"), m.get("genre"), m.get("mtime"), json.dumps(m)) for m in rows],
+            )
+            conn.executemany(
+                "INSERT OR IGNORE INTO playlist_media (playlist_id, media_id) VALUES (?, ?)",
+                [(p["id"], m["id"]) for m in rows for p in m.get("playlists") or []],
+            )
+    return True
+
+
+def playlist_ids_by_name(conn):
+    return dict(conn.execute("SELECT name_key, id FROM playlists"))
+
+
+def memberships(conn):
+    """(playlist_id, unique_id) pairs, keyed like the CSV exports' hex media ids."""
+    return set(
+        conn.execute(
+            "SELECT pm.playlist_id, m.unique_id FROM playlist_media pm JOIN media m ON m.id = pm.media_id"
+            " WHERE m.unique_id IS NOT NULL"
+        )
+    )
+
+
+def record_membership(conn, playlist_id, unique_id):
+    with conn:
+        conn.execute(
+            "INSERT OR IGNORE INTO playlist_media (playlist_id, media_id) SELECT ?, id FROM media WHERE unique_id = ?",
+            (playlist_id, unique_id),
+        )
+
+
+def media_paths(conn):
+    """unique_id -> path."""
+    return dict(conn.execute("SELECT unique_id, path FROM media WHERE unique_id IS NOT NULL"))
+
+
+def record_media_path(conn, unique_id, path):
+    with conn:
+        conn.execute("UPDATE media SET path = ? WHERE unique_id = ?", (path, unique_id))
+
+
+if __name__ == "__main__":
+    conn = connect()
+    started = time.monotonic()
+    changed = refresh(conn)
+    counts = [conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] for table in ("playlists", "media", "playlist_media")]
+    print(
+        f"{'Updated' if changed else 'Unchanged'} in {time.monotonic() - started:.1f}s | "
+        f"Playlists: {counts[0]} | Media: {counts[1]} | Memberships: {counts[2]}"
+    )
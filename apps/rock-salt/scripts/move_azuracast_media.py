@@ -1,6 +1,11 @@
 #!/usr/bin/env python3
 import csv
+import errno
+import hashlib
 import os
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 
 CSV_PATH = "agent_outputs/therocksalt_all_media_normalized.csv"
@@ -8,17 +13,115 @@ CSV_PATH = "agent_outputs/therocksalt_all_media_normalized.csv"
 # Local mount or SFTP-mapped directory for AzuraCast media
 # Example: /mnt/azuracast/stations/therocksalt/media
 MEDIA_ROOT = os.getenv("AZURACAST_MEDIA_ROOT")
+MOVE_WORKERS = int(os.getenv("MOVE_WORKERS", "4"))
+# "size" checks the copied length; "hash" also compares BLAKE2 digests (re-reads both files)
+VERIFY_COPIES = os.getenv("VERIFY_COPIES", "size").lower()
+# Mirror written by azuracast_catalog.py; optional, so requests is only needed when it exists
+CATALOG_PATH = os.getenv("AZURACAST_CATALOG", "agent_outputs/azuracast_catalog.sqlite3")
+PROGRESS_SECONDS = 2.0
+CHUNK_BYTES = 64 * 1024 * 1024
+
+# Kernel copy not possible for this pair of files: drop to the next strategy
+COPY_FALLBACK_ERRNOS = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.ENOTSUP, errno.ENOTSOCK}
 
 if not MEDIA_ROOT:
     raise SystemExit("Set AZURACAST_MEDIA_ROOT to the AzuraCast media folder")
 
 media_root = Path(MEDIA_ROOT)
 
+# Where AzuraCast last saw each file, keyed by unique_id, so re-runs skip rows already moved
+catalog_conn = None
+current_paths = {}
+if os.path.exists(CATALOG_PATH):
+    import azuracast_catalog as catalog
+
+    catalog_conn = catalog.connect(CATALOG_PATH)
+    current_paths = catalog.media_paths(catalog_conn)
+
+
+def copy_file_range_chunk(src_fd, dst_fd, offset, count):
+    return os.copy_file_range(src_fd, dst_fd, count, offset, offset)
+
+
+def sendfile_chunk(src_fd, dst_fd, offset, count):
+    os.lseek(dst_fd, offset, os.SEEK_SET)
+    return os.sendfile(dst_fd, src_fd, offset, count)
+
+
+def userspace_chunk(src_fd, dst_fd, offset, count):
+    return os.pwrite(dst_fd, os.pread(src_fd, min(count, 1024 * 1024), offset), offset)
+
+
+def copy_fd(src_fd, dst_fd, size):
+    """Copy `size` bytes, preferring in-kernel copies and falling back mid-file if one is refused."""
+    offset = 0
+    for copy_chunk in (copy_file_range_chunk, sendfile_chunk, userspace_chunk):
+        try:
+            while offset < size:
+                copied = copy_chunk(src_fd, dst_fd, offset, min(CHUNK_BYTES, size - offset))
+                # Some kernel/filesystem pairs report 0 instead of an error; only pread() is trusted for EOF
+                if not copied:
+                    break
+                offset += copied
+        except AttributeError:
+            continue
+        except OSError as exc:
+            if exc.errno not in COPY_FALLBACK_ERRNOS or copy_chunk is userspace_chunk:
+                raise
+        if offset == size:
+            break
+    return offset
+
+
+def file_digest(path):
+    digest = hashlib.blake2b()
+    with path.open("rb") as fh:
+        for block in iter(lambda: fh.read(CHUNK_BYTES), b""):
+            digest.update(block)
+    return digest.digest()
+
+
+def move_file(src, dst):
+    """Move src to dst, copying across filesystems when rename() hits EXDEV. Returns (bytes, method)."""
+    size = src.stat().st_size
+    try:
+        os.rename(src, dst)
+        return size, "rename"
+    except OSError as exc:
+        if exc.errno != errno.EXDEV:
+            raise
+
+    # Copy beside the destination so AzuraCast never sees a partial file under the real name
+    tmp = dst.with_name(f".{dst.name}.part")
+    try:
+        with src.open("rb") as fsrc, tmp.open("wb") as fdst:
+            copied = copy_fd(fsrc.fileno(), fdst.fileno(), size)
+            os.fsync(fdst.fileno())
+        if copied != size or tmp.stat().st_size != size:
+            raise OSError(errno.EIO, f"short copy ({copied} of {size} bytes)", str(src))
+        if VERIFY_COPIES == "hash" and file_digest(src) != file_digest(tmp):
+            raise OSError(errno.EIO, "checksum mismatch after copy", str(src))
+        shutil.copystat(src, tmp)
+        os.replace(tmp, dst)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    src.unlink()
+    return size, "copy"
+
+
+def format_mib(num_bytes):
+    return f"{num_bytes / (1024 * 1024):.1f} MiB"
+
+
+moves = []
+planned = set()
 with open(CSV_PATH, newline="", encoding="utf-8") as f:
     reader = csv.DictReader(f)
     for row in reader:
         genre = (row.get("genre") or "Unsorted").strip() or "Unsorted"
-        filename = row.get("path") or ""
+        media_id = row.get("id") or None
+        filename = current_paths.get(media_id) or row.get("path") or ""
         basename = Path(filename).name
         src = media_root / filename
         dst_dir = media_root / genre
@@ -26,8 +129,41 @@ with open(CSV_PATH, newline="", encoding="utf-8") as f:
         dst = dst_dir / basename
 
         if src.exists():
-            if dst.exists():
+            if dst.exists() or src in planned or dst in planned:
                 continue
-            src.rename(dst)
+            planned.update((src, dst))
+            moves.append((src, dst, media_id))
         else:
             print(f"[MISSING] {src}")
+
+moved = {"rename": 0, "copy": 0}
+failed = 0
+moved_bytes = 0
+started = time.monotonic()
+last_report = started
+
+with ThreadPoolExecutor(max_workers=MOVE_WORKERS) as pool:
+    futures = {pool.submit(move_file, src, dst): (src, dst, media_id) for src, dst, media_id in moves}
+    for done, future in enumerate(as_completed(futures), 1):
+        src, dst, media_id = futures[future]
+        try:
+            size, method = future.result()
+        except OSError as exc:
+            failed += 1
+            print(f"[ERROR] {src}: {exc}")
+        else:
+            moved[method] += 1
+            moved_bytes += size
+            if catalog_conn and media_id is not None:
+                catalog.record_media_path(catalog_conn, media_id, dst.relative_to(media_root).as_posix())
+        now = time.monotonic()
+        if now - last_report >= PROGRESS_SECONDS:
+            rate = moved_bytes / (now - started)
+            print(f"[PROGRESS] {done}/{len(moves)} files | {format_mib(moved_bytes)} | {format_mib(rate)}/s")
+            last_report = now
+
+elapsed = max(time.monotonic() - started, 1e-9)
+print(
+    f"Moved: {moved['rename'] + moved['copy']} (renamed {moved['rename']}, copied {moved['copy']}) | Failed: {failed}"
+    f" | {format_mib(moved_bytes)} in {elapsed:.1f}s ({format_mib(moved_bytes / elapsed)}/s)"
+)
@@ -0,0 +1,7 @@
+import sys
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).resolve().parent.parent
+
+# The scripts import their siblings by module name, as they do when run directly
+sys.path[:0] = [str(SCRIPTS_DIR), str(SCRIPTS_DIR / "audience")]
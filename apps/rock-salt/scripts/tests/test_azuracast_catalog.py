@@ -0,0 +1,166 @@
+import csv
+import hashlib
+import json
+import runpy
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+pytest.importorskip("requests")
+
+import azuracast_catalog as catalog
+
+SCRIPTS_DIR = Path(__file__).resolve().parent.parent
+API_KEY = "test-key"
+
+
+class FakeStation:
+    """Just enough of the AzuraCast station API: playlists, paginated files and playlist assignment."""
+
+    def __init__(self, media):
+        self.playlists = [{"id": 1, "name": "Rock"}, {"id": 2, "name": "Jazz "}]
+        self.media = media
+        self.requests = []  # (method, path, status)
+
+    def files_page(self, per_page, page):
+        total_pages = -(-len(self.media) // per_page)
+        rows = self.media[(page - 1) * per_page : page * per_page]
+        payload = {"page": page, "per_page": per_page, "total_pages": total_pages, "rows": rows}
+        return payload, '"' + hashlib.sha1(json.dumps(payload).encode()).hexdigest() + '"'
+
+    def handler(self):
+        station = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def send_json(self, payload, etag):
+                if self.headers.get("If-None-Match") == etag:
+                    station.requests.append(("GET", self.path, 304))
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.end_headers()
+                    return
+                station.requests.append(("GET", self.path, 200))
+                body = json.dumps(payload).encode()
+                self.send_response(200)
+                self.send_header("ETag", etag)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                if url.path.endswith("/playlists"):
+                    etag = '"' + hashlib.sha1(json.dumps(station.playlists).encode()).hexdigest() + '"'
+                    return self.send_json(station.playlists, etag)
+                query = parse_qs(url.query)
+                payload, etag = station.files_page(int(query["per_page"][0]), int(query["page"][0]))
+                return self.send_json(payload, etag)
+
+            def do_PUT(self):
+                # /api/station/{station}/playlists/{playlist_id}/media/{unique_id}
+                parts = urlparse(self.path).path.strip("/").split("/")
+                playlist_id, unique_id = int(parts[4]), parts[6]
+                for media in station.media:
+                    if media["unique_id"] == unique_id:
+                        media["playlists"].append({"id": playlist_id})
+                station.requests.append(("PUT", self.path, 204))
+                self.send_response(204)
+                self.end_headers()
+
+        return Handler
+
+
+def make_media(count):
+    return [
+        {
+            "id": i,
+            "unique_id": f"{i:024x}",
+            "path": f"incoming/track_{i}.mp3",
+            "genre": "Rock",
+            "mtime": 1700000000 + i,
+            "playlists": [{"id": 1}] if i <= 2 else [],
+        }
+        for i in range(1, count + 1)
+    ]
+
+
+@pytest.fixture
+def station(monkeypatch, tmp_path):
+    station = FakeStation(make_media(5))
+    server = ThreadingHTTPServer(("127.0.0.1", 0), station.handler())
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setattr(catalog, "AZURACAST_BASE", f"http://127.0.0.1:{server.server_address[1]}")
+    monkeypatch.setattr(catalog, "PER_PAGE", 2)
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "agent_outputs").mkdir()
+    yield station
+    server.shutdown()
+    server.server_close()
+
+
+def statuses(station):
+    return sorted(status for method, _, status in station.requests if method == "GET")
+
+
+def test_refresh_mirrors_all_pages_then_revalidates_with_304(station):
+    conn = catalog.connect()
+    assert catalog.refresh(conn, API_KEY) is True
+    assert statuses(station) == [200, 200, 200, 200]  # playlists + 3 media pages
+
+    assert catalog.playlist_ids_by_name(conn) == {"rock": 1, "jazz": 2}
+    assert catalog.memberships(conn) == {(1, f"{1:024x}"), (1, f"{2:024x}")}
+    assert catalog.media_paths(conn)[f"{5:024x}"] == "incoming/track_5.mp3"
+
+    station.requests.clear()
+    assert catalog.refresh(conn, API_KEY) is False
+    assert statuses(station) == [304, 304, 304, 304]
+    assert catalog.memberships(conn) == {(1, f"{1:024x}"), (1, f"{2:024x}")}
+
+
+def test_refresh_drops_media_when_the_page_count_shrinks(station):
+    conn = catalog.connect()
+    catalog.refresh(conn, API_KEY)
+
+    station.media[:] = station.media[:4]
+    station.requests.clear()
+    assert catalog.refresh(conn, API_KEY) is True
+    # Playlists revalidate; pages 1-2 carry the new total_pages; page 3 is no longer requested
+    assert statuses(station) == [200, 200, 304]
+    assert conn.execute("SELECT COUNT(*) FROM media").fetchone()[0] == 4
+    assert f"{5:024x}" not in catalog.media_paths(conn)
+    assert conn.execute("SELECT COUNT(*) FROM http_cache").fetchone()[0] == 3
+
+
+def test_assign_skips_existing_members_by_unique_id(station, monkeypatch, tmp_path):
+    export = tmp_path / "media.csv"
+    with export.open("w", newline="", encoding="utf-8") as fh:
+        writer = csv.writer(fh)
+        writer.writerow(["id", "path", "genre"])
+        for media in station.media:
+            writer.writerow([media["unique_id"], media["path"], "Rock"])
+        writer.writerow(["29ee774f3998fd3b1d91e934", "elsewhere.mp3", "Polka"])
+    monkeypatch.setenv("AZURACAST_API_KEY", API_KEY)
+    monkeypatch.setenv("AZURACAST_CSV", str(export))
+    script = str(SCRIPTS_DIR / "azuracast_assign_playlists.py")
+
+    monkeypatch.setenv("DRY_RUN", "true")
+    station.requests.clear()
+    runpy.run_path(script, run_name="__main__")
+    assert not [request for request in station.requests if request[0] == "PUT"]
+
+    monkeypatch.setenv("DRY_RUN", "false")
+    result = runpy.run_path(script, run_name="__main__")
+    assert (result["assigned"], result["skipped"], result["failed"]) == (3, 2, 0)
+    assert result["missing"] == ["Polka"]
+    assert len(catalog.memberships(catalog.connect())) == 5
+
+    result = runpy.run_path(script, run_name="__main__")
+    assert (result["assigned"], result["skipped"]) == (0, 5)
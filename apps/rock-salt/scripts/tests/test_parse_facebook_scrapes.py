@@ -0,0 +1,30 @@
+import csv
+
+import pytest
+
+import parse_facebook_scrapes as scrapes
+
+pl = pytest.importorskip("polars")
+
+LONG_TEXT = "Looking for a drummer for weekend shows in Salt Lake"
+
+
+def write_export(path, rows):
+    with path.open("w", newline="", encoding="utf-8") as fh:
+        writer = csv.writer(fh)
+        writer.writerow(["a", "b"])
+        writer.writerows(rows)
+    return path
+
+
+def test_polars_matches_stdlib_on_ragged_rows(tmp_path, monkeypatch):
+    monkeypatch.setattr(scrapes, "BATCH_ROWS", 2)
+    rows = [[f"{LONG_TEXT} {i}", f"https://facebook.com/groups/g{i}"] for i in range(5)]
+    rows.append([LONG_TEXT, "https://facebook.com/groups/x", "https://instagram.com/extra_cell"])
+    rows.append(["short"])
+    export = write_export(tmp_path / "ragged.csv", rows)
+
+    expected = list(scrapes.iter_rows_stdlib(export))
+    assert expected[5][0] == ["https://facebook.com/groups/x", "https://instagram.com/extra_cell"]
+    assert [tuple(map(list, row)) for row in scrapes.iter_rows_polars(export)] == expected
+    assert [tuple(map(list, row)) for row in scrapes.iter_rows_polars(export, 3)] == expected[3:]
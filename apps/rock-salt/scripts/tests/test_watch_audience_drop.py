@@ -0,0 +1,117 @@
+import csv
+
+import pytest
+
+import build_outreach_queue as queue
+import parse_facebook_scrapes as scrapes
+import watch_audience_drop as watcher
+
+OUTPUTS = ("normalized_posts.jsonl", "entity_index.csv", "summary.json", "outreach_queue.csv", "outreach_queue.json")
+
+
+def export_rows(prefix, count):
+    return [
+        [
+            f"{prefix} band {i} looking for a drummer for weekend shows, message @{prefix}_{i % 3}",
+            f"https://facebook.com/groups/{prefix}{i % 4}",
+            f"https://instagram.com/{prefix}_{i % 5}",
+        ]
+        for i in range(count)
+    ]
+
+
+def write_export(path, rows, mode="w"):
+    with path.open(mode, newline="", encoding="utf-8") as fh:
+        writer = csv.writer(fh)
+        if mode == "w":
+            writer.writerow(["text", "group", "profile"])
+        writer.writerows(rows)
+    return path
+
+
+def use_output_dir(monkeypatch, output_dir):
+    output_dir.mkdir()
+    monkeypatch.setattr(scrapes, "OUTPUT_DIR", output_dir)
+    monkeypatch.setattr(watcher, "STATE_PATH", output_dir / "watch_state.pickle")
+    monkeypatch.setattr(watcher, "NORMALIZED_JSONL", output_dir / "normalized_posts.jsonl")
+    monkeypatch.setattr(queue, "INPUT_JSONL", output_dir / "normalized_posts.jsonl")
+    monkeypatch.setattr(queue, "OUTPUT_CSV", output_dir / "outreach_queue.csv")
+    monkeypatch.setattr(queue, "OUTPUT_JSON", output_dir / "outreach_queue.json")
+
+
+def run_watcher(drop_dir):
+    summary, entities, offsets = watcher.load_state()
+    new_rows = watcher.ingest(watcher.list_exports(drop_dir), summary, entities, offsets)
+    if new_rows:
+        watcher.publish(summary, entities, offsets)
+    return new_rows
+
+
+@pytest.fixture
+def drop_dir(tmp_path):
+    path = tmp_path / "drop"
+    path.mkdir()
+    return path
+
+
+def test_incremental_ingest_matches_batch_run(tmp_path, monkeypatch, drop_dir):
+    export = write_export(drop_dir / "facebook (1).csv", export_rows("a", 40))
+
+    use_output_dir(monkeypatch, tmp_path / "watched")
+    assert run_watcher(drop_dir) == 40
+    write_export(export, export_rows("b", 25), mode="a")
+    assert run_watcher(drop_dir) == 25
+    assert run_watcher(drop_dir) == 0
+
+    use_output_dir(monkeypatch, tmp_path / "batch")
+    monkeypatch.setattr(scrapes, "FILES", [export])
+    scrapes.main()
+    queue.main()
+
+    for name in OUTPUTS:
+        assert (tmp_path / "watched" / name).read_bytes() == (tmp_path / "batch" / name).read_bytes(), name
+
+
+def test_cut_off_jsonl_line_is_truncated_and_state_reseeded(tmp_path, monkeypatch, drop_dir, capsys):
+    use_output_dir(monkeypatch, tmp_path / "out")
+    export = write_export(drop_dir / "a.csv", export_rows("a", 10))
+    run_watcher(drop_dir)
+    intact = watcher.NORMALIZED_JSONL.read_bytes()
+
+    # Crash mid-append: a partial line lands after the last save_state()
+    with watcher.NORMALIZED_JSONL.open("ab") as fh:
+        fh.write(b'{"source_file": "a.csv", "row_ind')
+    summary, entities, offsets = watcher.load_state()
+    assert "[STATE] stale" in capsys.readouterr().out
+    assert watcher.NORMALIZED_JSONL.read_bytes() == intact
+    assert summary.file_row_counts["a.csv"] == 10
+    assert offsets["a.csv"][1] == 10
+
+    # The rebuilt state was saved, so the next start does not rebuild again
+    watcher.load_state()
+    assert "[STATE]" not in capsys.readouterr().out
+
+    write_export(export, export_rows("b", 3), mode="a")
+    assert run_watcher(drop_dir) == 3
+
+
+def test_export_replaced_under_the_same_name_is_ingested_from_the_top(tmp_path, monkeypatch, drop_dir, capsys):
+    use_output_dir(monkeypatch, tmp_path / "out")
+    export = write_export(drop_dir / "a.csv", export_rows("old", 80))
+    assert run_watcher(drop_dir) == 80
+
+    write_export(export, export_rows("newpage", 60))
+    assert run_watcher(drop_dir) == 60
+    assert "[WARN] a.csv was replaced" in capsys.readouterr().out
+    assert watcher.NORMALIZED_JSONL.read_text(encoding="utf-8").count("newpage") > 0
+
+    # Same header and first row, but shorter: a fresh download of the same page, not an append
+    write_export(export, export_rows("newpage", 20))
+    assert run_watcher(drop_dir) == 20
+
+    # Offsets rebuilt from the JSONL resume after the latest download, not after all rows seen under the name
+    watcher.STATE_PATH.unlink()
+    summary, entities, offsets = watcher.load_state()
+    assert offsets["a.csv"][1] == 20
+    write_export(export, export_rows("more", 5), mode="a")
+    assert run_watcher(drop_dir) == 5